@@ -3,16 +3,34 @@ import socket
 import argparse
 import sys
 import os
-from struct import pack
+import time
+import select
+import struct
+import errno
+import ctypes
+import mmap
+from concurrent.futures import ThreadPoolExecutor
 
 
 DEFAULT_PORT = 69
 BLOCK_SIZE = 512
+MIN_BLKSIZE = 8
+MAX_BLKSIZE = 65464
+DEFAULT_BLKSIZE = MAX_BLKSIZE
+MAX_WINDOWSIZE = 65535
+# 기본 윈도우는 블록 크기와 곱해 이 바이트 수를 넘지 않게 잡음
+# (리눅스 기본 rmem_default 가 약 208KB 라 한 윈도우가 수신 버퍼를 넘치면 매번 유실됨)
+DEFAULT_WINDOW_BYTES = 128 * 1024
 DEFAULT_TRANSFER_MODE = 'octet'
 TIME_OUT = 5  
 MAX_TRY = 3 
+INITIAL_RTO_MS = 200
+# RRQ/WRQ 재전송은 보수적으로 (서버가 세션을 중복으로 열면 WRQ 는 파일을 다시 자를 수 있음)
+HANDSHAKE_RTO_MS = 1000
+MAX_RTO_MS = TIME_OUT * 1000
+SOCK_BUF_SIZE = 10 * 1024 * 1024
 
-OPCODE = {'RRQ': 1, 'WRQ': 2, 'DATA': 3, 'ACK': 4, 'ERROR': 5}
+OPCODE = {'RRQ': 1, 'WRQ': 2, 'DATA': 3, 'ACK': 4, 'ERROR': 5, 'OACK': 6}
 ERROR_CODE = {
     0: "Not defined.",
     1: "File not found.",
@@ -21,38 +39,636 @@ ERROR_CODE = {
     4: "Illegal TFTP operation.",
     5: "Unknown transfer ID.",
     6: "File already exists.",
-    7: "No such user."
+    7: "No such user.",
+    8: "Option negotiation failed."
 }
 
+# 패킷 처리 경로에서는 딕셔너리 조회 대신 상수/튜플 인덱싱 사용 (OPCODE, ERROR_CODE 는 그대로 유지)
+_OP_RRQ = OPCODE['RRQ']
+_OP_WRQ = OPCODE['WRQ']
+_OP_DATA = OPCODE['DATA']
+_OP_ACK = OPCODE['ACK']
+_OP_ERR = OPCODE['ERROR']
+_OP_OACK = OPCODE['OACK']
+_ERR = tuple(ERROR_CODE[code] for code in range(len(ERROR_CODE)))
 
-def send_rrq(sock, address, filename, mode):
-    """ Read Request (GET) 패킷 전송 """
-    format_str = f'>h{len(filename)}sB{len(mode)}sB'
-    rrq_message = pack(format_str, OPCODE['RRQ'], bytes(filename, 'utf-8'), 0, bytes(mode, 'utf-8'), 0)
-    sock.sendto(rrq_message, address)
-    # print(f"[DEBUG] Sent RRQ for {filename}")
+_ACK_PREFIX = _OP_ACK.to_bytes(2, 'big')
+_ERR5 = _OP_ERR.to_bytes(2, 'big') + (5).to_bytes(2, 'big') + ERROR_CODE[5].encode('ascii') + b'\x00'
+_ERR8 = _OP_ERR.to_bytes(2, 'big') + (8).to_bytes(2, 'big') + ERROR_CODE[8].encode('ascii') + b'\x00'
+_OP_BLK = struct.Struct('>HH')
+# 로컬 기록 실패 중 ERROR 3 (Disk full or allocation exceeded) 으로 알릴 것
+_DISK_FULL_ERRNOS = (errno.ENOSPC, errno.EFBIG, getattr(errno, 'EDQUOT', errno.ENOSPC))
 
 
-def send_wrq(sock, address, filename, mode):
-    """ Write Request (PUT) 패킷 전송 """
-    format_str = f'>h{len(filename)}sB{len(mode)}sB'
-    wrq_message = pack(format_str, OPCODE['WRQ'], bytes(filename, 'utf-8'), 0, bytes(mode, 'utf-8'), 0)
-    sock.sendto(wrq_message, address)
-    # print(f"[DEBUG] Sent WRQ for {filename}")
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
 
 
-def send_ack(sock, address, block_num):
-    """ ACK 패킷 전송 """
-    ack_message = pack('>hh', OPCODE['ACK'], block_num)
-    sock.sendto(ack_message, address)
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+
+class _PyBuffer(ctypes.Structure):
+    _fields_ = [('buf', ctypes.c_void_p), ('obj', ctypes.c_void_p),
+                ('len', ctypes.c_ssize_t), ('itemsize', ctypes.c_ssize_t),
+                ('readonly', ctypes.c_int), ('ndim', ctypes.c_int),
+                ('format', ctypes.c_char_p), ('shape', ctypes.c_void_p),
+                ('strides', ctypes.c_void_p), ('suboffsets', ctypes.c_void_p),
+                ('internal', ctypes.c_void_p)]
+
+
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+
+# sendmmsg 는 리눅스 전용, 그 외 환경에서는 패킷별 전송으로 대체
+# (iovec 주소는 CPython 버퍼 프로토콜로 얻으므로 pythonapi 도 필요)
+try:
+    _libc_sendmmsg = ctypes.CDLL('libc.so.6', use_errno=True).sendmmsg if sys.platform.startswith('linux') else None
+    _get_buffer = ctypes.pythonapi.PyObject_GetBuffer
+    _get_buffer.argtypes = [ctypes.py_object, ctypes.POINTER(_PyBuffer), ctypes.c_int]
+    _release_buffer = ctypes.pythonapi.PyBuffer_Release
+    _release_buffer.argtypes = [ctypes.POINTER(_PyBuffer)]
+except (OSError, AttributeError):
+    _libc_sendmmsg = None
+
+
+def encode_options(options):
+    """ 요청 패킷 뒤에 붙일 RFC 2347 옵션 인코딩 """
+    return b''.join(f'{name}\0{value}\0'.encode('utf-8') for name, value in options.items())
+
+
+def parse_oack(buf, nbytes):
+    """ OACK 패킷의 옵션을 dict 로 해석 (잘못된 UTF-8 은 대체 문자로) """
+    fields = bytes(buf[2:nbytes]).split(b'\0')
+    return {fields[i].decode('utf-8', 'replace').lower(): fields[i + 1].decode('utf-8', 'replace')
+            for i in range(0, len(fields) - 1, 2)}
+
+
+def negotiated_option(oack, name, default, low, high):
+    """ OACK 로 합의된 옵션 값 (옵션이 없으면 기본값, 숫자가 아니거나 범위를 벗어나면 None) """
+    try:
+        value = int(oack.get(name, default))
+    except ValueError:
+        return None
+    if low <= value <= high:
+        return value
+    return None
+
+
+def _make_req(opcode, filename_bytes, mode_bytes, options=None):
+    """ RRQ/WRQ 패킷 생성 (재전송 시 그대로 재사용) """
+    request = opcode.to_bytes(2, 'big') + filename_bytes + b'\x00' + mode_bytes + b'\x00'
+    if options:
+        request += encode_options(options)
+    return request
+
+
+def send_ack(sock, block_num):
+    """ ACK 패킷 전송 (TID 로 connect 된 소켓) """
+    sock.send(_ACK_PREFIX + block_num.to_bytes(2, 'big'))
     # print(f"[DEBUG] Sent ACK for block {block_num}")
 
 
-def send_data(sock, address, block_num, data):
-    """ DATA 패킷 전송 """
-    format_str = f'>hh{len(data)}s'
-    data_message = pack(format_str, OPCODE['DATA'], block_num, data)
-    sock.sendto(data_message, address)
+def send_error(sock, error_code, message):
+    """ ERROR 패킷 전송 (전송을 그만두는 쪽에서 보내므로 소켓 오류는 무시) """
+    try:
+        sock.send(_OP_ERR.to_bytes(2, 'big') + error_code.to_bytes(2, 'big')
+                  + message.encode('utf-8', 'replace') + b'\x00')
+    except OSError:
+        pass
+
+
+def _sendv(sock, buffers):
+    """ 여러 버퍼를 하나의 데이터그램으로 전송 (sendmsg 미지원 환경은 합쳐서 send) """
+    if _HAS_SENDMSG:
+        sock.sendmsg(buffers)
+    else:
+        sock.send(b''.join(buffers))
+
+
+def send_data(sock, block_num, data):
+    """ DATA 패킷 전송 (헤더와 데이터를 복사 없이 iovec 으로 전달) """
+    _sendv(sock, [_OP_BLK.pack(_OP_DATA, block_num), data])
+
+
+def _buffer_address(data):
+    """ 버퍼의 메모리 주소 (읽기 전용 mmap 슬라이스도 가능, data 가 살아 있는 동안만 유효) """
+    if not data:
+        return None
+    view = _PyBuffer()
+    _get_buffer(data, ctypes.byref(view), 0)
+    address = view.buf
+    _release_buffer(ctypes.byref(view))
+    return address
+
+
+def _sendmmsg(sock, msgs):
+    """ 데이터그램(버퍼 목록)들을 connect 된 소켓으로 sendmmsg 시스템 콜 한 번에 전송 """
+    count = len(msgs)
+    mmsgs = (_MMsgHdr * count)()
+    iovecs = []
+    for i, buffers in enumerate(msgs):
+        iov = (_IOVec * len(buffers))()
+        for j, data in enumerate(buffers):
+            iov[j].iov_base = _buffer_address(data)
+            iov[j].iov_len = len(data)
+        iovecs.append(iov)
+        hdr = mmsgs[i].msg_hdr
+        hdr.msg_iov = iov
+        hdr.msg_iovlen = len(buffers)
+
+    sent = _libc_sendmmsg(sock.fileno(), mmsgs, count, 0)
+    if sent < 0:
+        err = ctypes.get_errno()
+        if err not in (errno.EAGAIN, errno.EWOULDBLOCK):
+            raise OSError(err, os.strerror(err))
+        sent = 0
+    # 소켓 버퍼가 가득 차 일부만 전송된 경우 나머지는 하나씩 전송
+    for buffers in msgs[sent:]:
+        _sendv(sock, buffers)
+
+
+def send_window(sock, window):
+    """ 윈도우의 DATA 패킷들을 전송 (리눅스는 sendmmsg 한 번으로) """
+    if _libc_sendmmsg is None or len(window) == 1:
+        for block_num, data in window:
+            send_data(sock, block_num, data)
+    else:
+        pack_header = _OP_BLK.pack
+        _sendmmsg(sock, [[pack_header(_OP_DATA, block_num), data] for block_num, data in window])
+
+
+class RetransmitTimer:
+    """ 재전송 타이머: 측정한 RTT 로 정한 RTO(최소 200ms)에서 시작해 시간 초과마다 두 배씩 늘려 최대 TIME_OUT 까지 """
+
+    def __init__(self, sock):
+        # poll 이 없는 환경(Windows)은 select 로 대체
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            self._poll = poller.poll
+        else:
+            self._poll = lambda timeout_ms: select.select([sock], [], [], timeout_ms / 1000)[0]
+        self.base_rto_ms = INITIAL_RTO_MS
+        self.srtt_ms = None
+        self.rttvar_ms = None
+        self.reset()
+
+    def reset(self, rto_ms=None):
+        """ 응답을 제대로 받았을 때 RTO 와 재시도 횟수 초기화 (rto_ms 를 주면 그 값에서 시작) """
+        self.rto_ms = rto_ms or self.base_rto_ms
+        self.tries = 0
+        self.deadline = time.monotonic() + self.rto_ms / 1000
+
+    def wait(self):
+        """ 데드라인까지 수신 대기, 읽을 패킷이 있으면 True """
+        remaining_ms = (self.deadline - time.monotonic()) * 1000
+        return bool(self._poll(max(remaining_ms, 0)))
+
+    def expire(self):
+        """ 시간 초과 처리, 최대 RTO 에서 MAX_TRY 번 실패하면 False """
+        if self.rto_ms == MAX_RTO_MS:
+            self.tries += 1
+            if self.tries >= MAX_TRY:
+                return False
+        self.rto_ms = min(self.rto_ms * 2, MAX_RTO_MS)
+        self.deadline = time.monotonic() + self.rto_ms / 1000
+        return True
+
+    def sample(self, rtt_ms):
+        """ 재전송 없이 받은 응답의 RTT 로 초기 RTO 갱신 (RFC 6298) """
+        if self.srtt_ms is None:
+            self.srtt_ms = rtt_ms
+            self.rttvar_ms = rtt_ms / 2
+        else:
+            self.rttvar_ms = 0.75 * self.rttvar_ms + 0.25 * abs(self.srtt_ms - rtt_ms)
+            self.srtt_ms = 0.875 * self.srtt_ms + 0.125 * rtt_ms
+        # 지연이 일정하면 rttvar 가 0 에 가까워져 RTO 가 RTT 와 같아지므로 여유를 RTT 이상으로 둠
+        margin_ms = max(4 * self.rttvar_ms, self.srtt_ms)
+        self.base_rto_ms = min(max(self.srtt_ms + margin_ms, INITIAL_RTO_MS), MAX_RTO_MS)
+
+
+def _report(filename, message):
+    """ 전송별 메시지를 파일명을 붙여 출력 (병렬 다운로드 시 줄이 섞이지 않게 한 번에 기록) """
+    sys.stdout.write(f"{filename}: {message}\n")
+
+
+def _abort_get(state):
+    """ 받던 파일을 지우고 전송 중단 (핸들러에서 그대로 반환) """
+    os.close(state['fd'])
+    os.remove(state['filename'])
+    state['failed'] = True
+    return True
+
+
+def _handle_data(state, block_number, nbytes):
+    """ DATA: 순서대로 온 블록은 기록하고 윈도우 단위로 ACK, 마지막 블록이면 True """
+    sock = state['sock']
+    if block_number == state['expected_block']:
+        # 버퍼 계층 없이 raw fd 에 바로 기록 (부분 기록이면 나머지를 이어서)
+        data = state['mv'][4:nbytes]
+        try:
+            while data:
+                data = data[os.write(state['fd'], data):]
+        except OSError as e:
+            # 로컬 기록 실패는 서버에 ERROR 3(디스크 부족) 또는 0 으로 알리고 중단
+            _report(state['filename'], f"Error writing file: {e}")
+            if e.errno in _DISK_FULL_ERRNOS:
+                send_error(sock, 3, _ERR[3])
+            else:
+                send_error(sock, 0, e.strerror or str(e))
+            return _abort_get(state)
+        state['expected_block'] = (block_number + 1) & 0xFFFF
+
+        # 윈도우 단위로만 ACK (RFC 7440), 마지막 블록은 즉시 ACK
+        last_block = nbytes - 4 < state['block_size']
+        if last_block or (block_number - state['last_acked']) & 0xFFFF >= state['window_size']:
+            send_ack(sock, block_number)
+            state['last_acked'] = block_number
+            state['acked_at'] = time.monotonic()
+            state['rtt_pending'] = True
+
+        if last_block:
+            _report(state['filename'], "Download completed.")
+        return last_block
+
+    # 새로 발견한 누락이거나 마지막 ACK 가 유실되어 재전송된 윈도우이면
+    # 순서대로 받은 마지막 블록을 ACK 하여 그 다음부터 재전송하게 함
+    # 재전송된 윈도우에는 RTO 에 한 번만 ACK (중복 윈도우마다 ACK 하면 Sorcerer's Apprentice)
+    last_good = (state['expected_block'] - 1) & 0xFFFF
+    now = time.monotonic()
+    if state['last_acked'] != last_good or (
+            block_number == last_good and now - state['acked_at'] >= state['timer'].base_rto_ms / 1000):
+        send_ack(sock, last_good)
+        state['last_acked'] = last_good
+        state['acked_at'] = now
+        state['rtt_pending'] = False
+    return False
+
+
+def _handle_oack(state, block_number, nbytes):
+    """ OACK: 합의된 옵션을 적용하고 ACK 0 전송 """
+    if state['expected_block'] != 1:
+        return False
+    buf = state['buf']
+    oack = parse_oack(buf, nbytes)
+    block_size = negotiated_option(oack, 'blksize', BLOCK_SIZE, MIN_BLKSIZE, len(buf) - 4)
+    window_size = negotiated_option(oack, 'windowsize', 1, 1, state['max_windowsize'])
+    if block_size is None or window_size is None:
+        # 받아들일 수 없는 OACK 는 ERROR 8 로 알리고 종료 (RFC 2347)
+        _report(state['filename'], "Error: Server negotiated invalid options.")
+        state['sock'].send(_ERR8)
+        return _abort_get(state)
+    if 'tsize' in oack:
+        _report(state['filename'], f"File size: {oack['tsize']} bytes")
+    state['block_size'] = block_size
+    state['window_size'] = window_size
+    send_ack(state['sock'], 0)
+    state['acked_at'] = time.monotonic()
+    state['rtt_pending'] = True
+    return False
+
+
+def _handle_error(state, error_code, nbytes):
+    """ ERROR: 에러 메시지 출력 후 종료 """
+    # 메시지는 NUL 종료 문자열, 슬라이스 복사 없이 memoryview 에서 바로 디코딩
+    end = state['buf'].find(0, 4, nbytes)
+    err_msg = str(state['mv'][4:end if end >= 0 else nbytes], 'utf-8', 'ignore')
+    _report(state['filename'], f"TFTP Error {error_code}: {_ERR[error_code] if error_code < len(_ERR) else 'Unknown'} ({err_msg})")
+    return _abort_get(state)
+
+
+def _handle_bad(state, block_number, nbytes):
+    """ 그 외 opcode 는 무시 """
+    return False
+
+
+_GET_HANDLERS = {
+    _OP_DATA: _handle_data,
+    _OP_OACK: _handle_oack,
+    _OP_ERR: _handle_error,
+}
+
+
+def open_socket():
+    """ 전송에 사용할 UDP 소켓 생성 """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(TIME_OUT)
+    # 커널이 rmem_max/wmem_max 로 제한할 수 있으므로 실패해도 기본 크기로 진행
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCK_BUF_SIZE)
+    except OSError:
+        pass
+    return sock
+
+
+def get_file(server_address, filename, mode_b, args):
+    """ 파일 하나를 다운로드 (전송마다 자신의 소켓/TID 사용), 성공하면 True """
+    # O_EXCL 로 존재 확인과 생성을 한 번에 처리 (Windows 는 O_BINARY 필요)
+    try:
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o644)
+    except FileExistsError:
+        _report(filename, "Error: File already exists locally.")
+        return False
+    except OSError as e:
+        _report(filename, f"Error opening file: {e}")
+        return False
+
+    sock = open_socket()
+    timer = RetransmitTimer(sock)
+    buf = bytearray(max(args.blksize, BLOCK_SIZE) + 4)
+    mv = memoryview(buf)
+    filename_b = filename.encode('utf-8')
+
+    options = {'tsize': 0}
+    if args.blksize != BLOCK_SIZE:
+        options['blksize'] = args.blksize
+    if args.windowsize != 1:
+        options['windowsize'] = args.windowsize
+    block_size = BLOCK_SIZE
+    window_size = 1
+
+    request = _make_req(_OP_RRQ, filename_b, mode_b, options)
+    sock.sendto(request, server_address)
+    timer.reset(HANDSHAKE_RTO_MS)
+    sent_at = time.monotonic()
+    while True:
+        if not timer.wait():
+            if not timer.expire():
+                _report(filename, "Error: Server not responding.")
+                os.close(fd)
+                os.remove(filename)
+                sock.close()
+                return False
+            _report(filename, f"Timeout... Retrying (RTO {timer.rto_ms} ms)")
+            sock.sendto(request, server_address)
+            sent_at = None
+            continue
+
+        nbytes, new_address = sock.recvfrom_into(buf)
+        if new_address[0] != server_address[0]:
+            # 요청한 서버가 아닌 호스트의 패킷은 ERROR 5 로 응답하고 무시 (RFC 1350)
+            sock.sendto(_ERR5, new_address)
+            continue
+        # 재전송하지 않은 요청의 응답 시간으로 전송 단계의 RTO 를 정함 (Karn)
+        if sent_at is not None:
+            timer.sample((time.monotonic() - sent_at) * 1000)
+            sent_at = None
+        opcode, error_code = _OP_BLK.unpack_from(buf)
+        if options and opcode == _OP_ERR and error_code == 8:
+            _report(filename, "Server rejected options. Retrying with default block size...")
+            options = None
+            request = _make_req(_OP_RRQ, filename_b, mode_b)
+            sock.sendto(request, server_address)
+            timer.reset(HANDSHAKE_RTO_MS)
+            sent_at = time.monotonic()
+            continue
+        # 이후로는 서버가 할당한 TID 로만 주고받으므로 connect (다른 주소의 패킷은 커널이 걸러냄)
+        server_address = new_address  
+        sock.connect(server_address)
+        break
+
+   
+    state = {
+        'sock': sock, 'buf': buf, 'mv': mv,
+        'fd': fd, 'filename': filename, 'max_windowsize': args.windowsize,
+        'block_size': block_size, 'window_size': window_size,
+        'expected_block': 1, 'last_acked': 0,
+        'timer': timer, 'acked_at': time.monotonic(), 'rtt_pending': False,
+    }
+    # 루프 안에서 반복되는 속성/딕셔너리 조회를 미리 바인딩
+    _unpack = _OP_BLK.unpack_from
+    _dispatch = _GET_HANDLERS.get
+    _recv = sock.recv_into
+    try:
+        while True:
+            opcode, block_number = _unpack(buf)
+            if _dispatch(opcode, _handle_bad)(state, block_number, nbytes):
+                break
+
+            # 시간 초과 시 순서대로 받은 마지막 블록을 다시 ACK 하여 서버의 재전송을 유도
+            timer.reset()
+            while not timer.wait():
+                if not timer.expire():
+                    break
+                state['last_acked'] = (state['expected_block'] - 1) & 0xFFFF
+                send_ack(sock, state['last_acked'])
+                state['acked_at'] = time.monotonic()
+                state['rtt_pending'] = False
+            else:
+                nbytes = _recv(buf)
+                # 윈도우 ACK 부터 다음 DATA 까지를 RTT 로 측정 (재전송한 ACK 는 제외)
+                if state['rtt_pending']:
+                    timer.sample((time.monotonic() - state['acked_at']) * 1000)
+                    state['rtt_pending'] = False
+                continue
+            _report(filename, "Timeout waiting for data. Exiting.")
+            _abort_get(state)
+            break
+    except ConnectionRefusedError as e:
+        # connect 이후 서버 TID 가 닫히면 ICMP port unreachable 이 ConnectionRefusedError 로 올라옴
+        _report(filename, f"Error: Connection to server lost ({e}).")
+        if not state.get('failed'):
+            _abort_get(state)
+
+    # 실패한 경우 fd 는 _abort_get 에서 이미 닫힘
+    if not state.get('failed'):
+        os.close(fd)
+    sock.close()
+    return not state.get('failed')
+
+
+def put_file(server_address, filename, mode_b, args):
+    """ 파일 하나를 업로드 (get_file 과 같은 출력/에러 처리), 성공하면 True """
+    filename_b = filename.encode('utf-8')
+
+    if not os.path.exists(filename):
+        _report(filename, "Error: File not found.")
+        return False
+
+    try:
+        file = open(filename, 'rb')
+    except IOError as e:
+        _report(filename, f"Error opening file: {e}")
+        return False
+
+    sock = open_socket()
+    try:
+        return _put_blocks(sock, server_address, file, filename, filename_b, mode_b, args)
+    finally:
+        file.close()
+        sock.close()
+
+
+def _put_blocks(sock, server_address, file, filename, filename_b, mode_b, args):
+    """ WRQ 핸드셰이크 후 파일을 윈도우 단위로 전송, 성공하면 True """
+    timer = RetransmitTimer(sock)
+    buf = bytearray(max(args.blksize, BLOCK_SIZE) + 4)
+
+    file_size = os.path.getsize(filename)
+    options = {'tsize': file_size}
+    if args.blksize != BLOCK_SIZE:
+        options['blksize'] = args.blksize
+    if args.windowsize != 1:
+        options['windowsize'] = args.windowsize
+    block_size = BLOCK_SIZE
+    window_size = 1
+
+    request = _make_req(_OP_WRQ, filename_b, mode_b, options)
+    sock.sendto(request, server_address)
+    timer.reset(HANDSHAKE_RTO_MS)
+    sent_at = time.monotonic()
+    while True:
+        if not timer.wait():
+            if not timer.expire():
+                _report(filename, "Error: Server not responding or Protocol Error.")
+                return False
+            _report(filename, f"Timeout... Retrying (RTO {timer.rto_ms} ms)")
+            sock.sendto(request, server_address)
+            sent_at = None
+            continue
+
+        nbytes, new_address = sock.recvfrom_into(buf)
+        if new_address[0] != server_address[0]:
+            # 요청한 서버가 아닌 호스트의 패킷은 ERROR 5 로 응답하고 무시 (RFC 1350)
+            sock.sendto(_ERR5, new_address)
+            continue
+        # 재전송하지 않은 요청의 응답 시간으로 전송 단계의 RTO 를 정함 (Karn)
+        if sent_at is not None:
+            timer.sample((time.monotonic() - sent_at) * 1000)
+            sent_at = None
+        opcode, ack_block = _OP_BLK.unpack_from(buf)
+
+        if opcode == _OP_ACK and ack_block == 0:
+            server_address = new_address
+            sock.connect(server_address)
+            break
+        elif opcode == _OP_OACK:
+            # 옵션을 수락한 서버는 ACK 0 대신 OACK 로 응답
+            server_address = new_address
+            sock.connect(server_address)
+            oack = parse_oack(buf, nbytes)
+            block_size = negotiated_option(oack, 'blksize', BLOCK_SIZE, MIN_BLKSIZE, len(buf) - 4)
+            window_size = negotiated_option(oack, 'windowsize', 1, 1, args.windowsize)
+            if block_size is None or window_size is None:
+                # 받아들일 수 없는 OACK 는 ERROR 8 로 알리고 종료 (RFC 2347)
+                _report(filename, "Error: Server negotiated invalid options.")
+                sock.send(_ERR8)
+                return False
+            break
+        elif opcode == _OP_ERR and options and ack_block == 8:
+            _report(filename, "Server rejected options. Retrying with default block size...")
+            options = None
+            request = _make_req(_OP_WRQ, filename_b, mode_b)
+            sock.sendto(request, server_address)
+            timer.reset(HANDSHAKE_RTO_MS)
+            sent_at = time.monotonic()
+        elif opcode == _OP_ERR:
+            error_code = ack_block
+            _report(filename, f"TFTP Error {error_code}: {_ERR[error_code] if error_code < len(_ERR) else 'Unknown'}")
+            return False
+
+    # 파일을 mmap 해서 블록을 페이지 캐시에서 바로 잘라 보냄 (read() 복사 없음)
+    # 매핑할 수 없으면 (빈 파일, 주소 공간 부족 등) 윈도우 크기의 읽기 버퍼를 슬롯별로 재사용
+    try:
+        file_mv = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        file_mv = None
+        block_mv = memoryview(bytearray(block_size * window_size))
+        slot = 0
+    offset = 0
+
+    # 루프 안에서 반복되는 속성/딕셔너리 조회를 미리 바인딩
+    _unpack = _OP_BLK.unpack_from
+    _recv = sock.recv_into
+
+    window = []  # 전송 후 ACK 를 기다리는 (블록 번호, 데이터)
+    block_number = 1
+    eof = False
+    try:
+        while True:
+            while not eof and len(window) < window_size:
+                if file_mv is not None:
+                    file_block = file_mv[offset:offset + block_size]
+                else:
+                    file_block = block_mv[slot * block_size:(slot + 1) * block_size]
+                    try:
+                        file_block = file_block[:file.readinto(file_block)]
+                    except OSError as e:
+                        # 로컬 읽기 실패는 서버에 ERROR 0 으로 알리고 중단
+                        _report(filename, f"Transfer failed: Error reading file: {e}")
+                        send_error(sock, 0, e.strerror or str(e))
+                        return False
+                    slot = (slot + 1) % window_size
+                offset += len(file_block)
+                window.append((block_number, file_block))
+                block_number = (block_number + 1) & 0xFFFF
+                eof = len(file_block) < block_size
+
+            send_window(sock, window)
+            timer.reset()
+            sent_at = resent_at = time.monotonic()
+            retransmitted = False
+            ack_received = False
+            while not ack_received:
+                if not timer.wait():
+                    if not timer.expire():
+                        break
+                    _report(filename, f"Timeout waiting for ACK {window[-1][0]}. Retrying...")
+                    send_window(sock, window)
+                    resent_at = time.monotonic()
+                    retransmitted = True
+                    continue
+
+                # 그 외 윈도우 밖의 중복 ACK 는 재전송 없이 무시 (타이머는 그대로 진행)
+                nbytes = _recv(buf)
+                opcode, ack_block = _unpack(buf)
+
+                if opcode == _OP_ACK:
+                    # 윈도우 중간 블록의 ACK 는 그 블록까지만 확인된 것
+                    acked = (ack_block - window[0][0]) & 0xFFFF
+                    if acked < len(window):
+                        del window[:acked + 1]
+                        ack_received = True
+                        # 재전송한 윈도우의 ACK 는 어느 전송에 대한 것인지 모르므로 RTT 측정 제외 (Karn)
+                        if not retransmitted:
+                            timer.sample((time.monotonic() - sent_at) * 1000)
+                    elif acked == 0xFFFF and time.monotonic() - resent_at >= timer.rto_ms / 1000:
+                        # 윈도우 첫 블록 직전의 ACK 는 서버의 재전송 요청 (RFC 7440)
+                        # 중복 ACK 마다 보내면 재전송 폭주가 되므로 RTO 에 한 번만
+                        send_window(sock, window)
+                        resent_at = time.monotonic()
+                        retransmitted = True
+                elif opcode == _OP_ERR:
+                    error_code = ack_block
+                    _report(filename, f"TFTP Error {error_code}: {_ERR[error_code] if error_code < len(_ERR) else 'Unknown'}")
+                    return False
+
+            if not ack_received:
+                _report(filename, "Transfer failed: Max retries exceeded.")
+                return False
+
+            if eof and not window:
+                _report(filename, "Upload completed.")
+                return True
+    except ConnectionRefusedError as e:
+        # 서버 TID 가 닫힌 뒤의 send/recv 는 ConnectionRefusedError (ICMP port unreachable)
+        _report(filename, f"Transfer failed: Connection to server lost ({e}).")
+        return False
+    except OSError as e:
+        # 매핑된 파일이 전송 중에 잘리면 커널이 블록을 복사하다 EFAULT 를 돌려줌
+        if e.errno != errno.EFAULT:
+            raise
+        _report(filename, "Transfer failed: File was truncated during upload.")
+        send_error(sock, 0, "File truncated during upload")
+        return False
 
 
 
@@ -61,10 +677,27 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='TFTP Client')
     parser.add_argument("host", help="Server IP or Domain name")
     parser.add_argument("operation", choices=['get', 'put'], help="Operation: get or put")
-    parser.add_argument("filename", help="Filename to transfer")
+    parser.add_argument("filename", nargs='+', help="Filename(s) to transfer (put takes one)")
     parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="Server Port")
+    parser.add_argument("-b", "--blksize", type=int, default=DEFAULT_BLKSIZE,
+                        help=f"Block size to negotiate (RFC 2348, {MIN_BLKSIZE}-{MAX_BLKSIZE})")
+    parser.add_argument("-w", "--windowsize", type=int,
+                        help=f"Window size to negotiate (RFC 7440, 1-{MAX_WINDOWSIZE}, "
+                             f"default: about {DEFAULT_WINDOW_BYTES // 1024}KB per window)")
+    parser.add_argument("-P", "--parallel", type=int, default=1,
+                        help="Number of files to download at the same time (get)")
 
     args = parser.parse_args()
+    if not MIN_BLKSIZE <= args.blksize <= MAX_BLKSIZE:
+        parser.error(f"blksize must be between {MIN_BLKSIZE} and {MAX_BLKSIZE}")
+    if args.windowsize is None:
+        args.windowsize = max(1, DEFAULT_WINDOW_BYTES // args.blksize)
+    if not 1 <= args.windowsize <= MAX_WINDOWSIZE:
+        parser.error(f"windowsize must be between 1 and {MAX_WINDOWSIZE}")
+    if args.parallel < 1:
+        parser.error("parallel must be at least 1")
+    if args.operation == 'put' and len(args.filename) > 1:
+        parser.error("put takes a single filename")
 
    
     try:
@@ -77,146 +710,24 @@ if __name__ == '__main__':
     server_port = args.port
     server_address = (server_ip, server_port)
 
-    
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.settimeout(TIME_OUT)
-
     mode = DEFAULT_TRANSFER_MODE
     operation = args.operation
-    filename = args.filename
+    # 요청 패킷에 들어가는 모드는 한 번만 인코딩
+    mode_b = mode.encode('utf-8')
 
     
     if operation == 'get':
-        if os.path.exists(filename):
-            print(f"Error: '{filename}' already exists locally.")
-            sys.exit(1)
-
-        try:
-            file = open(filename, 'wb')
-        except IOError as e:
-            print(f"Error opening file: {e}")
-            sys.exit(1)
-
-        received_first_packet = False
-        for try_count in range(MAX_TRY):
-            send_rrq(sock, server_address, filename, mode)
-            try:
-                data, new_address = sock.recvfrom(516)
-                server_address = new_address  
-                received_first_packet = True
-                break
-            except socket.timeout:
-                print(f"Timeout... Retrying ({try_count + 1}/{MAX_TRY})")
-
-        if not received_first_packet:
-            print("Error: Server not responding.")
-            file.close()
-            os.remove(filename)
+        if len(args.filename) > 1 and args.parallel > 1:
+            # 파일마다 별도의 소켓(TID)으로 최대 parallel 개를 동시에 다운로드
+            with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+                results = list(pool.map(lambda name: get_file(server_address, name, mode_b, args),
+                                         args.filename))
+        else:
+            results = [get_file(server_address, name, mode_b, args) for name in args.filename]
+        if not all(results):
             sys.exit(1)
 
-       
-        expected_block = 1
-        while True:
-            opcode = int.from_bytes(data[:2], 'big')
-
-            if opcode == OPCODE['DATA']:
-                block_number = int.from_bytes(data[2:4], 'big')
-                if block_number == expected_block:
-                    file_data = data[4:]
-                    file.write(file_data)
-                    send_ack(sock, server_address, block_number)
-                    expected_block += 1
-
-                    if len(file_data) < BLOCK_SIZE:
-                        print(f"Download '{filename}' completed.")
-                        break
-                else:
-                    send_ack(sock, server_address, block_number)
-
-            elif opcode == OPCODE['ERROR']:
-                error_code = int.from_bytes(data[2:4], 'big')
-                err_msg = data[4:-1].decode('utf-8', errors='ignore')
-                print(f"TFTP Error {error_code}: {ERROR_CODE.get(error_code, 'Unknown')} ({err_msg})")
-                file.close()
-                os.remove(filename)
-                sys.exit(1)
-
-            try:
-                data, _ = sock.recvfrom(516)
-            except socket.timeout:
-                print("Timeout waiting for data. Exiting.")
-                break
-
-        file.close()
-
    
     elif operation == 'put':
-        if not os.path.exists(filename):
-            print(f"Error: File '{filename}' not found.")
-            sys.exit(1)
-
-        try:
-            file = open(filename, 'rb')
-        except IOError as e:
-            print(f"Error opening file: {e}")
+        if not put_file(server_address, args.filename[0], mode_b, args):
             sys.exit(1)
-
-        received_ack0 = False
-        for try_count in range(MAX_TRY):
-            send_wrq(sock, server_address, filename, mode)
-            try:
-                data, new_address = sock.recvfrom(516)
-                server_address = new_address
-                opcode = int.from_bytes(data[:2], 'big')
-
-                if opcode == OPCODE['ACK'] and int.from_bytes(data[2:4], 'big') == 0:
-                    received_ack0 = True
-                    break
-                elif opcode == OPCODE['ERROR']:
-                    error_code = int.from_bytes(data[2:4], 'big')
-                    print(f"TFTP Error {error_code}: {ERROR_CODE.get(error_code, 'Unknown')}")
-                    sys.exit(1)
-            except socket.timeout:
-                print(f"Timeout... Retrying ({try_count + 1}/{MAX_TRY})")
-
-        if not received_ack0:
-            print("Error: Server not responding or Protocol Error.")
-            sys.exit(1)
-
-        block_number = 1
-        while True:
-            file_block = file.read(BLOCK_SIZE)
-
-            ack_received = False
-            for try_count in range(MAX_TRY):
-                send_data(sock, server_address, block_number, file_block)
-
-                try:
-                    data, _ = sock.recvfrom(516)
-                    opcode = int.from_bytes(data[:2], 'big')
-
-                    if opcode == OPCODE['ACK']:
-                        if int.from_bytes(data[2:4], 'big') == block_number:
-                            ack_received = True
-                            break
-                    elif opcode == OPCODE['ERROR']:
-                        error_code = int.from_bytes(data[2:4], 'big')
-                        print(f"TFTP Error {error_code}: {ERROR_CODE.get(error_code, 'Unknown')}")
-                        file.close()
-                        sys.exit(1)
-                except socket.timeout:
-                    print(f"Timeout waiting for ACK {block_number}. Retrying...")
-
-            if not ack_received:
-                print("Transfer failed: Max retries exceeded.")
-                break
-
-            block_number += 1
-            if len(file_block) < BLOCK_SIZE:
-                print(f"Upload '{filename}' completed.")
-                break
-
-        file.close()
-
-
-    sock.close()